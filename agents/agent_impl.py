@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, Callable, List, Union
+from typing import Dict, Any, Optional, Callable, List, Tuple, Union
 import threading
 import time
 import logging
@@ -210,6 +210,47 @@ class BasicAgent(Agent):
             self.logger.error(f"Error sending message: {e}", exc_info=True)
             return ""
         
+    def send_messages_batch(
+        self,
+        envelopes: List[Tuple[str, Union[MessageType, str], Dict[str, Any]]],
+        priority: int = 2
+    ) -> List[str]:
+        """
+        批量发送消息
+        
+        Args:
+            envelopes: (接收者ID, 消息类型, 消息内容) 列表
+            priority: 优先级
+            
+        Returns:
+            与输入一一对应的消息ID，路由失败的位置为空字符串
+        """
+        try:
+            messages = [
+                Message(
+                    sender_id=self.agent_id,
+                    receiver_id=receiver_id,
+                    msg_type=msg_type,
+                    content=content,
+                    priority=priority
+                )
+                for receiver_id, msg_type, content in envelopes
+            ]
+            
+            results = self.router.route_messages(messages)
+            message_ids = []
+            for message, routing_success in zip(messages, results):
+                if routing_success:
+                    message_ids.append(message.message_id)
+                else:
+                    self.logger.warning(f"Failed to route message to {message.receiver_id}")
+                    message_ids.append("")
+            return message_ids
+        
+        except Exception as e:
+            self.logger.error(f"Error sending message batch: {e}", exc_info=True)
+            return [""] * len(envelopes)
+        
     def get_status(self) -> Dict[str, Any]:
         """获取智能体状态"""
         return {
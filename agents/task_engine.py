@@ -1,4 +1,6 @@
 from typing import Dict, Any, List, Optional, Callable
+from collections import Counter
+import threading
 import uuid
 import time
 import logging
@@ -20,6 +22,10 @@ class TaskEngine:
         self.tasks: Dict[str, Task] = {}  # 本地任务缓存
         self.task_processors: Dict[str, Callable[[Task], Dict[str, Any]]] = {}
         
+        # 任务计数在状态变更时增量维护，避免统计时遍历全部任务
+        self._counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        
         # 注册默认的任务处理器
         self._register_default_processors()
         
@@ -40,8 +46,11 @@ class TaskEngine:
     
     def submit_task(self, task: Task) -> str:
         """提交任务到系统"""
+        previous = self.tasks.get(task.task_id)
         self.tasks[task.task_id] = task
         self.logger.info(f"Task {task.task_id} submitted")
+        if previous is not task:
+            self._record_status_change(task, previous.status if previous else None)
         
         # 如果任务分配给了当前智能体，则开始处理
         if task.assigned_agent == self.agent.agent_id:
@@ -69,6 +78,7 @@ class TaskEngine:
     
     def _process_assigned_task(self, task: Task) -> None:
         """处理分配给当前智能体的任务"""
+        previous_status = task.status
         try:
             # 更新状态
             task.start_execution()
@@ -99,6 +109,8 @@ class TaskEngine:
             self.logger.error(f"Error processing task {task.task_id}: {e}")
             task.fail(str(e))
             self._notify_task_failure(task)
+        finally:
+            self._record_status_change(task, previous_status)
     
     def _process_default_task(self, task: Task) -> Dict[str, Any]:
         """默认任务处理器"""
@@ -113,6 +125,33 @@ class TaskEngine:
             "processed_by": self.agent.agent_id
         }
     
+    def _record_status_change(self, task: Task, previous_status: Optional[TaskStatus]) -> None:
+        """
+        记录任务状态变更：更新任务计数
+        
+        Args:
+            task: 状态已变更的任务
+            previous_status: 变更前的状态，None表示新任务
+        """
+        if task.status == previous_status:
+            return
+        
+        with self._counts_lock:
+            counts = self._counts
+            if previous_status is None:
+                counts["total"] += 1
+                if task.priority >= 3:
+                    counts["high_priority"] += 1
+            elif previous_status == TaskStatus.COMPLETED:
+                counts["completed"] -= 1
+            elif previous_status == TaskStatus.FAILED:
+                counts["failed"] -= 1
+            
+            if task.status == TaskStatus.COMPLETED:
+                counts["completed"] += 1
+            elif task.status == TaskStatus.FAILED:
+                counts["failed"] += 1
+    
     def _notify_task_completion(self, task: Task) -> None:
         """通知任务完成"""
         if task.creator_id:
@@ -166,7 +205,9 @@ class TaskEngine:
         
         if task_id in self.tasks:
             task = self.tasks[task_id]
+            previous_status = task.status
             task.complete(result)
+            self._record_status_change(task, previous_status)
             self.logger.info(f"Task {task_id} completed with result: {result}")
         
         return {"status": "acknowledged"}
@@ -178,7 +219,9 @@ class TaskEngine:
         
         if task_id in self.tasks:
             task = self.tasks[task_id]
+            previous_status = task.status
             task.fail(error)
+            self._record_status_change(task, previous_status)
             self.logger.warning(f"Task {task_id} failed with error: {error}")
         
         return {"status": "acknowledged"}
@@ -190,4 +233,15 @@ class TaskEngine:
     
     def get_all_tasks(self) -> List[Dict[str, Any]]:
         """获取所有任务状态"""
-        return [task.to_dict() for task in self.tasks.values()]
\ No newline at end of file
+        return [task.to_dict() for task in self.tasks.values()]
+    
+    def status_counts(self) -> Dict[str, int]:
+        """获取任务计数（total/completed/failed/high_priority）"""
+        with self._counts_lock:
+            counts = self._counts
+            return {
+                "total": counts["total"],
+                "completed": counts["completed"],
+                "failed": counts["failed"],
+                "high_priority": counts["high_priority"]
+            }
\ No newline at end of file
@@ -2,7 +2,7 @@
 Common type definitions for the multi-agent system
 """
 from enum import Enum
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from typing import Dict, Any, Mapping, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from agents.base_agent import Agent
@@ -52,5 +52,5 @@ class RuntimeManagerInterface:
     def get_agent(self, agent_id: str) -> Optional['Agent']:
         raise NotImplementedError()
     
-    def get_all_agents(self) -> Dict[str, 'Agent']:
+    def get_all_agents(self) -> Mapping[str, 'Agent']:
         raise NotImplementedError()
\ No newline at end of file
@@ -1,7 +1,10 @@
 import json
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Optional, Union
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Union
 from enum import Enum
 
 class MessageType(Enum):
@@ -75,24 +78,51 @@ class MessageSchema:
         }
     }
 
+_ts_cache = threading.local()
+
+def _format_timestamp(ts_ns: int) -> str:
+    """将纳秒时间戳格式化为ISO 8601字符串
+
+    同一秒内的消息共享缓存的日期时间前缀（按线程缓存），只需拼接微秒部分。
+    """
+    seconds, remainder = divmod(ts_ns, 1_000_000_000)
+    if getattr(_ts_cache, "seconds", None) != seconds:
+        _ts_cache.prefix = datetime.fromtimestamp(seconds).isoformat()
+        _ts_cache.seconds = seconds
+    
+    micros = remainder // 1000
+    if not micros:
+        return _ts_cache.prefix
+    return f"{_ts_cache.prefix}.{micros:06d}"
+
+def _freeze(mapping: Mapping[str, Any]) -> Mapping[str, Any]:
+    """返回只读映射视图，已冻结的直接复用"""
+    if isinstance(mapping, MappingProxyType):
+        return mapping
+    return MappingProxyType(mapping)
+
 class Message:
-    """标准化消息对象"""
+    """标准化消息对象
+
+    content 与 metadata 以只读视图 (MappingProxyType) 暴露，组播时各副本可直接共享，
+    无需防御性拷贝；需要修改的处理器请自行 dict(...) 复制。
+    """
     
     def __init__(
         self,
         sender_id: str,
         receiver_id: str,
         msg_type: Union[MessageType, str],
-        content: Dict[str, Any],
+        content: Mapping[str, Any],
         priority: Union[MessagePriority, int] = MessagePriority.NORMAL,
         conversation_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Mapping[str, Any]] = None
     ):
         # 基本验证
         if not sender_id or not receiver_id:
             raise ValueError("sender_id and receiver_id cannot be empty")
         
-        if not content or not isinstance(content, dict):
+        if not content or not isinstance(content, Mapping):
             raise ValueError("content must be a non-empty dictionary")
         
         # 设置属性
@@ -100,11 +130,16 @@ class Message:
         self.sender_id = sender_id
         self.receiver_id = receiver_id
         self.msg_type = msg_type.value if isinstance(msg_type, Enum) else msg_type
-        self.content = content
-        self.timestamp = datetime.now().isoformat()
+        self.content = _freeze(content)
+        self._ts_ns = time.time_ns()
         self.priority = priority.value if isinstance(priority, Enum) else priority
         self.conversation_id = conversation_id or str(uuid.uuid4())
-        self.metadata = metadata or {}
+        self.metadata = _freeze(metadata or {})
+    
+    @property
+    def timestamp(self) -> str:
+        """ISO 8601格式时间戳，仅在访问时格式化"""
+        return _format_timestamp(self._ts_ns)
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典，符合JSON Schema"""
@@ -113,11 +148,11 @@ class Message:
             "sender_id": self.sender_id,
             "receiver_id": self.receiver_id,
             "msg_type": self.msg_type,
-            "content": self.content,
+            "content": dict(self.content),
             "timestamp": self.timestamp,
             "priority": self.priority,
             "conversation_id": self.conversation_id,
-            "metadata": self.metadata
+            "metadata": dict(self.metadata)
         }
     
     def serialize(self) -> str:
@@ -140,23 +175,34 @@ class Message:
     
     def validate(self) -> bool:
         """验证消息是否符合schema (简化版)"""
-        data = self.to_dict()
-        
+        # 直接检查属性，不经过 to_dict()，避免在发布路径上格式化时间戳和复制内容
         # 基本验证
-        required_fields = ["message_id", "sender_id", "receiver_id", "msg_type", "content", "timestamp"]
-        for field in required_fields:
-            if field not in data:
+        for value in (self.message_id, self.sender_id, self.receiver_id, self.msg_type, self._ts_ns):
+            if value is None:
                 return False
         
         # 类型验证
-        if not isinstance(data["content"], dict):
+        if not isinstance(self.content, Mapping):
             return False
         
-        if not isinstance(data["priority"], int) or not (1 <= data["priority"] <= 4):
+        if not isinstance(self.priority, int) or not (1 <= self.priority <= 4):
             return False
         
         return True
     
+    def __getstate__(self) -> Dict[str, Any]:
+        """序列化状态：只读视图无法 pickle/deepcopy，转换为普通字典"""
+        state = self.__dict__.copy()
+        state["content"] = dict(self.content)
+        state["metadata"] = dict(self.metadata)
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """恢复状态并重新冻结 content/metadata"""
+        self.__dict__.update(state)
+        self.content = _freeze(self.content)
+        self.metadata = _freeze(self.metadata)
+    
     def __repr__(self) -> str:
         return (f"Message(id={self.message_id[:8]}, from={self.sender_id}, "
                 f"to={self.receiver_id}, type={self.msg_type})")
\ No newline at end of file
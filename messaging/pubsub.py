@@ -1,7 +1,8 @@
-from typing import Callable, Dict, List, Set, Any, Optional
+from typing import Callable, Dict, List, Set, Any, Optional, Iterable, Tuple
 import threading
 import queue
 import time
+import logging
 from .message import Message
 
 class PubSubError(Exception):
@@ -12,13 +13,35 @@ class MessageQueue:
     """线程安全的消息队列"""
     
     def __init__(self, maxsize: int = 0):
-        self._queue = queue.Queue(maxsize)
-        self._lock = threading.Lock()
+        # 无界队列使用C实现的SimpleQueue，避免Queue的条件变量开销；
+        # 仅在需要容量限制时才使用queue.Queue
+        if maxsize > 0:
+            self._queue = queue.Queue(maxsize)
+        else:
+            self._queue = queue.SimpleQueue()
     
     def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> None:
         """放入消息"""
         self._queue.put(item, block, timeout)
     
+    def put_many(self, items: List[Any]) -> None:
+        """批量放入消息（非阻塞），有界队列只获取一次内部锁"""
+        if not items:
+            return
+        
+        q = self._queue
+        if isinstance(q, queue.SimpleQueue):
+            for item in items:
+                q.put(item)
+            return
+        
+        with q.mutex:
+            if 0 < q.maxsize < q._qsize() + len(items):
+                raise queue.Full
+            q.queue.extend(items)
+            q.unfinished_tasks += len(items)
+            q.not_empty.notify(len(items))
+    
     def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
         """获取消息"""
         return self._queue.get(block, timeout)
@@ -34,16 +57,63 @@ class MessageQueue:
 class PubSubBus:
     """发布/订阅消息总线实现"""
     
-    def __init__(self):
-        self._subscribers: Dict[str, List[Callable[[Message], None]]] = {}
+    def __init__(self, safe_mode: bool = False):
+        """
+        初始化消息总线
+        
+        Args:
+            safe_mode: 是否对所有订阅者启用异常隔离。默认仅对以 handles_errors=True
+                订阅的回调（如路由器注册的回调，自行处理异常）直接调用，其余订阅者
+                始终有异常保护；开启后所有订阅者调用都有异常保护并记录日志
+        """
+        self._safe_mode = safe_mode
+        self.logger = logging.getLogger("PubSubBus")
+        # 主题订阅者以不可变元组保存（写时复制），分发时无需加锁拷贝；元组中保存的是
+        # 订阅时就已确定是否带异常保护的投递函数，分发时无需逐个判断
+        self._subscribers: Dict[str, Tuple[Callable[[Message], None], ...]] = {}
+        # 每个主题的 回调 -> 是否自行处理异常（有序字典，O(1)判重并保持订阅顺序）
+        self._subscriber_flags: Dict[str, Dict[Callable[[Message], None], bool]] = {}
         self._broadcast_subscribers: List[Callable[[Message], None]] = []
         self._topic_lock = threading.Lock()
         self._subscriber_lock = threading.Lock()
         self._message_queue = MessageQueue()
+        # 入队/出队计数，仅用于监控时无锁估算队列长度（并发下允许少量误差）
+        self._enqueued = 0
+        self._dequeued = 0
         self._running = False
         self._worker_thread = None
         self._stop_event = threading.Event()
     
+    @property
+    def safe_mode(self) -> bool:
+        """是否对所有订阅者启用异常隔离"""
+        return self._safe_mode
+    
+    @safe_mode.setter
+    def safe_mode(self, enabled: bool) -> None:
+        with self._topic_lock:
+            self._safe_mode = enabled
+            for topic in self._subscriber_flags:
+                self._rebuild_topic(topic)
+    
+    def _guard(self, callback: Callable[[Message], None]) -> Callable[[Message], None]:
+        """包装回调，单个订阅者的异常只记录日志，不影响其他订阅者"""
+        def guarded(message: Message) -> None:
+            try:
+                callback(message)
+            except Exception:
+                self.logger.exception("Error delivering message %s to subscriber", message.message_id)
+        return guarded
+    
+    def _rebuild_topic(self, topic: str) -> None:
+        """根据订阅标记重建主题的投递元组（调用方持有 _topic_lock）"""
+        flags = self._subscriber_flags.get(topic, {})
+        # 自行处理异常的订阅者（如路由器回调）在非安全模式下直接调用
+        self._subscribers[topic] = tuple(
+            callback if handles_errors and not self._safe_mode else self._guard(callback)
+            for callback, handles_errors in flags.items()
+        )
+    
     def start(self) -> None:
         """启动消息处理线程"""
         if self._running:
@@ -70,56 +140,72 @@ class PubSubBus:
             try:
                 # 从队列获取消息，设置超时以便定期检查停止信号
                 topic, message = self._message_queue.get(timeout=0.5)
+                self._dequeued += 1
                 
                 # 处理消息
                 self._dispatch_message(topic, message)
                 
             except queue.Empty:
                 continue
-            except Exception as e:
-                print(f"Error in message worker: {e}")
+            except Exception:
+                self.logger.exception("Error in message worker")
     
     def _dispatch_message(self, topic: str, message: Message) -> None:
         """分发消息给订阅者"""
         # 1. 发送给特定主题的订阅者
-        with self._subscriber_lock:
-            subscribers = self._subscribers.get(topic, [])[:]
-        
-        for subscriber in subscribers:
-            try:
+        # 元组中的投递函数已按需带异常保护，直接调用
+        subscribers = self._subscribers.get(topic, ())
+        n = len(subscribers)
+        if n == 1:
+            # 智能体主题与智能体一一对应，单订阅者是最常见的情况
+            subscribers[0](message)
+        elif n > 1:
+            for subscriber in subscribers:
                 subscriber(message)
-            except Exception as e:
-                print(f"Error delivering message to subscriber: {e}")
         
-        # 2. 处理广播消息
+        # 2. 处理广播消息（广播订阅者始终有异常保护）
         if topic == "broadcast" or message.receiver_id == "broadcast":
             with self._subscriber_lock:
-                broadcast_subscribers = self._broadcast_subscribers[:]
+                broadcast_subscribers = tuple(self._broadcast_subscribers)
             
             for subscriber in broadcast_subscribers:
                 try:
                     subscriber(message)
-                except Exception as e:
-                    print(f"Error delivering broadcast message: {e}")
+                except Exception:
+                    self.logger.exception("Error delivering message %s to subscriber", message.message_id)
     
-    def subscribe(self, topic: str, callback: Callable[[Message], None]) -> None:
-        """订阅特定主题"""
+    def subscribe(self, topic: str, callback: Callable[[Message], None], handles_errors: bool = False) -> None:
+        """
+        订阅特定主题
+        
+        Args:
+            topic: 主题
+            callback: 回调函数
+            handles_errors: 回调是否自行处理全部异常；为True时（非安全模式下）分发不做异常保护
+        """
         if not callable(callback):
             raise ValueError("Callback must be callable")
         
         with self._topic_lock:
-            if topic not in self._subscribers:
-                self._subscribers[topic] = []
+            flags = self._subscriber_flags.setdefault(topic, {})
             
             # 避免重复订阅
-            if callback not in self._subscribers[topic]:
-                self._subscribers[topic].append(callback)
+            if callback in flags:
+                return
+            
+            flags[callback] = handles_errors
+            delivery = callback if handles_errors and not self._safe_mode else self._guard(callback)
+            self._subscribers[topic] = self._subscribers.get(topic, ()) + (delivery,)
     
     def unsubscribe(self, topic: str, callback: Callable[[Message], None]) -> None:
         """取消订阅特定主题"""
         with self._topic_lock:
-            if topic in self._subscribers and callback in self._subscribers[topic]:
-                self._subscribers[topic].remove(callback)
+            flags = self._subscriber_flags.get(topic)
+            if not flags or callback not in flags:
+                return
+            
+            del flags[callback]
+            self._rebuild_topic(topic)
     
     def subscribe_broadcast(self, callback: Callable[[Message], None]) -> None:
         """订阅广播消息"""
@@ -149,11 +235,33 @@ class PubSubBus:
             self._message_queue.put((topic, message), block=False)
         except queue.Full:
             raise PubSubError("Message queue is full, unable to publish message")
+        self._enqueued += 1
+    
+    def publish_many(self, pairs: Iterable[Tuple[str, Message]]) -> None:
+        """批量发布消息，一次性放入队列"""
+        pairs = list(pairs)
+        for _, message in pairs:
+            if not isinstance(message, Message):
+                raise ValueError("Message must be an instance of Message class")
+            
+            if not message.validate():
+                raise ValueError("Message validation failed")
+        
+        try:
+            self._message_queue.put_many(pairs)
+        except queue.Full:
+            raise PubSubError("Message queue is full, unable to publish messages")
+        self._enqueued += len(pairs)
+    
+    @property
+    def approximate_size(self) -> int:
+        """队列中待处理消息数的近似值（无锁读取，适用于监控）"""
+        return max(self._enqueued - self._dequeued, 0)
     
     def get_subscriber_count(self, topic: str) -> int:
         """获取特定主题的订阅者数量"""
         with self._topic_lock:
-            return len(self._subscribers.get(topic, []))
+            return len(self._subscribers.get(topic, ()))
     
     def get_broadcast_subscriber_count(self) -> int:
         """获取广播订阅者数量"""
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, List, Callable
+from typing import Dict, Optional, List, Callable, Tuple
 from .message import Message
 from .pubsub import PubSubBus
 import threading
@@ -19,6 +19,7 @@ class MessageRouter:
         self.agent_instances: Dict[str, 'Agent'] = {}  # agent_id -> agent_instance
         self.group_routes: Dict[str, List[str]] = {}  # group_id -> [agent_ids]
         self.fallback_handlers: List[Callable[[Message], bool]] = []
+        self.route_observers: List[Callable[[Message], None]] = []
         self._route_lock = threading.Lock()
         self.logger = logging.getLogger("MessageRouter")
     
@@ -31,8 +32,10 @@ class MessageRouter:
             self.agent_routes[agent_id] = topic
             if agent_instance:
                 self.agent_instances[agent_id] = agent_instance
-            # 订阅该主题
-            self.pubsub_bus.subscribe(topic, lambda msg: self._handle_routed_message(msg, agent_id))
+            # 订阅该主题（_handle_routed_message 自行处理异常）
+            self.pubsub_bus.subscribe(
+                topic, lambda msg: self._handle_routed_message(msg, agent_id), handles_errors=True
+            )
     
     def unregister_agent(self, agent_id: str) -> None:
         """注销智能体路由"""
@@ -63,6 +66,26 @@ class MessageRouter:
         
         self.fallback_handlers.append(handler)
     
+    def add_route_observer(self, observer: Callable[[Message], None]) -> None:
+        """添加路由观察者，每条成功路由到具体智能体的消息都会通知观察者（用于调试、统计等）"""
+        if not callable(observer):
+            raise ValueError("Observer must be callable")
+        
+        # 写时复制，通知时遍历的列表不受并发增删影响
+        self.route_observers = self.route_observers + [observer]
+    
+    def remove_route_observer(self, observer: Callable[[Message], None]) -> None:
+        """移除路由观察者"""
+        self.route_observers = [o for o in self.route_observers if o != observer]
+    
+    def _notify_route_observers(self, message: Message) -> None:
+        """通知路由观察者，观察者的异常不影响路由"""
+        for observer in self.route_observers:
+            try:
+                observer(message)
+            except Exception:
+                self.logger.exception("Error in route observer")
+    
     def _handle_routed_message(self, message: Message, agent_id: str) -> None:
         """处理路由到特定智能体的消息"""
         # 这里可以添加路由级别的中间件逻辑
@@ -76,10 +99,10 @@ class MessageRouter:
         if agent:
             try:
                 agent.handle_message(message)
-            except Exception as e:
-                print(f"Error handling message in agent {agent_id}: {e}")
+            except Exception:
+                self.logger.exception("Error handling message in agent %s", agent_id)
         else:
-            print(f"No agent instance found for agent_id: {agent_id}")
+            self.logger.warning("No agent instance found for agent_id: %s", agent_id)
     
     def route_message(self, message: Message) -> bool:
         """路由消息到目标"""
@@ -100,12 +123,14 @@ class MessageRouter:
                     group_members = self.group_routes[group_id][:]
             
             if group_members:
-                for agent_id in group_members:
-                    with self._route_lock:
-                        topic = self.agent_routes.get(agent_id)
-                    
+                # 一次性取出所有成员的主题，再批量发布
+                with self._route_lock:
+                    member_topics = [(agent_id, self.agent_routes.get(agent_id)) for agent_id in group_members]
+                
+                pairs = []
+                for agent_id, topic in member_topics:
                     if topic:
-                        # 创建消息副本，避免修改原始消息
+                        # 创建消息副本；content/metadata 为只读视图，可直接共享
                         msg_copy = Message(
                             sender_id=message.sender_id,
                             receiver_id=agent_id,
@@ -113,10 +138,14 @@ class MessageRouter:
                             content=message.content,
                             priority=message.priority,
                             conversation_id=message.conversation_id,
-                            metadata=message.metadata.copy()
+                            metadata=message.metadata
                         )
-                        self.pubsub_bus.publish(topic, msg_copy)
+                        pairs.append((topic, msg_copy))
                         self.logger.debug(f"Published message {message.message_id} to group member {agent_id}")
+                self.pubsub_bus.publish_many(pairs)
+                # 组消息按实际投递的成员逐个通知观察者
+                for _, msg_copy in pairs:
+                    self._notify_route_observers(msg_copy)
                 return True
         
         # 3. 检查是否为单个智能体消息
@@ -127,6 +156,7 @@ class MessageRouter:
         if topic:
             self.pubsub_bus.publish(topic, message)
             self.logger.debug(f"Published message {message.message_id} to agent {message.receiver_id} on topic {topic}")
+            self._notify_route_observers(message)
             return True
         
         # 4. 尝试回退处理器
@@ -139,6 +169,56 @@ class MessageRouter:
         self.logger.warning(f"No route found for message to {message.receiver_id}")
         return False
     
+    def route_messages(self, messages: List[Message]) -> List[bool]:
+        """
+        批量路由消息
+        
+        点对点消息在一次加锁内解析主题后批量发布；广播、组消息及无直接路由的
+        消息按原有顺序逐条交给 route_message 处理。
+        
+        Args:
+            messages: 待路由的消息列表
+            
+        Returns:
+            与消息一一对应的路由结果；发布中途失败时，失败点之前已发布的消息仍为True
+        """
+        with self._route_lock:
+            topics = [self.agent_routes.get(message.receiver_id) for message in messages]
+        
+        results = []
+        pairs = []
+        try:
+            for message, topic in zip(messages, topics):
+                receiver_id = message.receiver_id
+                if topic and receiver_id != "broadcast" and not receiver_id.startswith("group:"):
+                    pairs.append((topic, message))
+                    results.append(True)
+                    continue
+                
+                # 先发布已累积的消息，保持消息顺序
+                if pairs:
+                    self._publish_routed(pairs)
+                    pairs = []
+                results.append(self.route_message(message))
+            
+            if pairs:
+                self._publish_routed(pairs)
+                pairs = []
+        except Exception:
+            self.logger.exception("Error routing message batch")
+            # 之前已发布的消息保留成功结果；未能发布的待发消息及其后的消息标记为失败
+            del results[len(results) - len(pairs):]
+            results.extend([False] * (len(messages) - len(results)))
+        
+        self.logger.debug(f"Routed batch of {len(messages)} messages")
+        return results
+    
+    def _publish_routed(self, pairs: List[Tuple[str, Message]]) -> None:
+        """批量发布已解析主题的点对点消息，并通知路由观察者"""
+        self.pubsub_bus.publish_many(pairs)
+        for _, message in pairs:
+            self._notify_route_observers(message)
+    
     def get_routes(self) -> Dict[str, str]:
         """获取所有注册的路由"""
         with self._route_lock:
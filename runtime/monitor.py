@@ -1,11 +1,13 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Mapping, Tuple, Union
 import threading
 import time
 import logging
 from agents.base_agent import AgentStatus
-from agents.task import TaskStatus
 from .types import RuntimeManagerInterface
 
+# 预先取出枚举值，避免在热循环中重复解析枚举属性
+_TERMINATED = AgentStatus.TERMINATED
+
 class ExecutionMonitor:
     """执行监控器"""
     
@@ -15,6 +17,14 @@ class ExecutionMonitor:
         self.monitoring = False
         self.monitor_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        self._health_checks: List[Callable[[], None]] = []
+    
+    def register_check(self, check: Callable[[], None]) -> None:
+        """注册在每个监控周期执行的健康检查"""
+        if not callable(check):
+            raise ValueError("Check must be callable")
+        
+        self._health_checks.append(check)
         
     def start_monitoring(self) -> None:
         """开始监控"""
@@ -40,14 +50,25 @@ class ExecutionMonitor:
     
     def _monitor_loop(self) -> None:
         """监控循环"""
-        while not self.stop_event.is_set():
+        while True:
             try:
                 self._collect_metrics()
                 self._check_system_health()
-                time.sleep(5.0)  # 每5秒检查一次
+                interval = 5.0  # 每5秒检查一次
             except Exception as e:
                 self.logger.error(f"Error in monitor loop: {e}")
-                time.sleep(1.0)
+                interval = 1.0
+            
+            # 注册的检查各自独立执行，互不影响，也不受上面指标收集失败的影响
+            for check in self._health_checks:
+                try:
+                    check()
+                except Exception:
+                    self.logger.exception("Error in registered health check %r", check)
+            
+            # 等待期间收到停止信号时立即退出
+            if self.stop_event.wait(interval):
+                break
     
     def _collect_metrics(self) -> None:
         """收集系统指标"""
@@ -74,42 +95,66 @@ class ExecutionMonitor:
         # 检查智能体状态
         agents = self.runtime_manager.get_all_agents()
         terminated_agents = [aid for aid, agent in agents.items() 
-                           if agent.status == AgentStatus.TERMINATED]
+                           if agent.status is _TERMINATED]
         if terminated_agents:
             self.logger.warning(f"Terminated agents detected: {terminated_agents}")
     
-    def get_system_metrics(self) -> Dict[str, Any]:
-        """获取系统指标"""
-        agents = self.runtime_manager.get_all_agents()
-        total_tasks = 0
-        completed_tasks = 0
-        failed_tasks = 0
-        high_priority_tasks = 0
-        
-        # 收集所有智能体的任务信息
+    def _sum_task_counts(self, agents: Mapping[str, Any]) -> Dict[str, int]:
+        """汇总各任务引擎按状态变更维护的计数（O(智能体数)）"""
+        totals = {"total": 0, "completed": 0, "failed": 0, "high_priority": 0}
         for agent in agents.values():
-            if hasattr(agent, 'task_engine'):
-                tasks = agent.task_engine.get_all_tasks()
-                total_tasks += len(tasks)
-                completed_tasks += len([t for t in tasks if t["status"] == TaskStatus.COMPLETED.value])
-                failed_tasks += len([t for t in tasks if t["status"] == TaskStatus.FAILED.value])
-                high_priority_tasks += len([t for t in tasks if t["priority"] >= 3])
+            task_engine = getattr(agent, 'task_engine', None)
+            if task_engine is None:
+                continue
+            
+            counts = task_engine.status_counts()
+            for key in totals:
+                totals[key] += counts[key]
+        return totals
+    
+    def get_system_metrics(
+        self, include_agents: bool = False
+    ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
+        """
+        获取系统指标
         
-        return {
+        Args:
+            include_agents: 是否同时返回各智能体指标（基于同一份智能体快照）
+            
+        Returns:
+            系统指标字典；include_agents为True时返回 (系统指标, {agent_id: 智能体指标})
+        """
+        agents = self.runtime_manager.get_all_agents()
+        counters = self._sum_task_counts(agents)
+        
+        metrics = {
             "total_agents": len(agents),
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "failed_tasks": failed_tasks,
-            "high_priority_tasks": high_priority_tasks,
+            "total_tasks": counters["total"],
+            "completed_tasks": counters["completed"],
+            "failed_tasks": counters["failed"],
+            "high_priority_tasks": counters["high_priority"],
             "system_uptime": time.time() - self.runtime_manager.get_system_status()["timestamp"]
         }
+        
+        if not include_agents:
+            return metrics
+        
+        agent_metrics = {
+            agent_id: self._build_agent_metrics(agent_id, agent)
+            for agent_id, agent in agents.items()
+        }
+        return metrics, agent_metrics
     
     def get_agent_metrics(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """获取特定智能体的指标"""
         agent = self.runtime_manager.get_agent(agent_id)
         if not agent:
             return None
-            
+        
+        return self._build_agent_metrics(agent_id, agent)
+    
+    def _build_agent_metrics(self, agent_id: str, agent: Any) -> Dict[str, Any]:
+        """构建单个智能体的指标"""
         metrics = {
             "agent_id": agent_id,
             "status": agent.status.value,
@@ -119,23 +164,16 @@ class ExecutionMonitor:
         }
         
         if hasattr(agent, 'task_engine'):
-            tasks = agent.task_engine.get_all_tasks()
-            metrics["task_count"] = len(tasks)
-            metrics["completed_tasks"] = len([t for t in tasks if t["status"] == TaskStatus.COMPLETED.value])
-            metrics["failed_tasks"] = len([t for t in tasks if t["status"] == TaskStatus.FAILED.value])
+            counts = agent.task_engine.status_counts()
+            metrics["task_count"] = counts["total"]
+            metrics["completed_tasks"] = counts["completed"]
+            metrics["failed_tasks"] = counts["failed"]
         
         return metrics
     
     def generate_report(self) -> Dict[str, Any]:
         """生成监控报告"""
-        system_metrics = self.get_system_metrics()
-        agents = self.runtime_manager.get_all_agents()
-        
-        agent_reports = {}
-        for agent_id in agents:
-            agent_metrics = self.get_agent_metrics(agent_id)
-            if agent_metrics:
-                agent_reports[agent_id] = agent_metrics
+        system_metrics, agent_reports = self.get_system_metrics(include_agents=True)
         
         return {
             "timestamp": time.time(),
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Mapping
+from types import MappingProxyType
 import threading
 import time
 import logging
@@ -10,16 +11,26 @@ from agents.base_agent import AgentStatus
 from .monitor import ExecutionMonitor
 from .types import RuntimeManagerInterface
 
+_TERMINATED = AgentStatus.TERMINATED
+
+# 仅保护单例的首次创建，创建完成后的访问无需加锁
+_init_lock = threading.Lock()
+
 class RuntimeManager(RuntimeManagerInterface):
     """运行时管理器"""
     
     _instance = None
     
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(RuntimeManager, cls).__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
+        instance = cls._instance
+        if instance is None:
+            with _init_lock:
+                instance = cls._instance
+                if instance is None:
+                    instance = super(RuntimeManager, cls).__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
+        return instance
     
     def _initialize(self):
         """初始化运行时管理器"""
@@ -32,78 +43,60 @@ class RuntimeManager(RuntimeManagerInterface):
         # 启动消息总线
         self.message_bus.start()
         
-        # 智能体注册表
-        self.agents: Dict[str, BasicAgent] = {}
+        # 智能体注册表（写时复制）：写操作在锁内构建新字典并整体替换，
+        # 读操作直接使用当前的只读视图，无需加锁或拷贝
+        self._agents: Dict[str, BasicAgent] = {}
+        self.agents: Mapping[str, BasicAgent] = MappingProxyType(self._agents)
         self._agent_lock = threading.Lock()
         
         # 系统状态
         self._running = True
-        self._monitor_thread = None
-        self._stop_event = threading.Event()
         
-        # 新增执行监控器
+        # 系统状态缓存 (生成时间, 状态字典)，短时间内的重复查询直接复用
+        self._status_cache_ttl = 0.25
+        self._status_cache: tuple = (0.0, None)
+        
+        # 执行监控器（唯一的监控线程），运行时的健康检查注册到其中
         self.execution_monitor = ExecutionMonitor(self)
+        self.execution_monitor.register_check(self._check_agent_health)
         self.execution_monitor.start_monitoring()
-
-        # 启动监控线程
-        self._start_monitor()
         
         self.logger.info("Runtime manager initialized successfully")
     
-    def _start_monitor(self) -> None:
-        """启动监控线程"""
-        self._monitor_thread = threading.Thread(
-            target=self._monitor_loop,
-            name="runtime-monitor",
-            daemon=True
-        )
-        self._monitor_thread.start()
-    
-    def _monitor_loop(self) -> None:
-        """监控循环"""
-        self.logger.info("Runtime monitor started")
-        
-        while not self._stop_event.is_set():
-            try:
-                # 监控系统健康状态
-                self._check_system_health()
-                
-                # 监控智能体状态
-                self._check_agent_health()
-                
-                # 等待下一次检查
-                time.sleep(5.0)
-                
-            except Exception as e:
-                self.logger.error(f"Error in monitor loop: {e}")
-                time.sleep(1.0)
-    
-    def _check_system_health(self) -> None:
-        """检查系统健康状态"""
-        # 检查消息总线状态
-        queue_size = self.message_bus._message_queue.qsize()
-        if queue_size > 100:  # 阈值可以根据需要调整
-            self.logger.warning(f"Message queue size is high: {queue_size}")
-    
     def _check_agent_health(self) -> None:
         """检查智能体健康状态"""
-        with self._agent_lock:
-            terminated_agents = []
-            
-            for agent_id, agent in self.agents.items():
-                # 检查智能体状态
-                if agent.status == AgentStatus.TERMINATED:
-                    terminated_agents.append(agent_id)
-                
-                # 检查心跳
-                last_heartbeat = agent.state_manager.get("last_heartbeat", 0)
-                if time.time() - last_heartbeat > 30:  # 15秒无心跳
-                    self.logger.warning(f"Agent {agent_id} has no heartbeat for 15 seconds")
-            
-            # 清理已终止的智能体
-            for agent_id in terminated_agents:
-                del self.agents[agent_id]
-                self.logger.info(f"Removed terminated agent: {agent_id}")
+        # 在当前只读快照上采集状态与心跳，读取过程无需持有 _agent_lock
+        agents = self.agents
+        snapshot = [
+            (agent_id, agent.status, agent.state_manager.get("last_heartbeat", 0))
+            for agent_id, agent in agents.items()
+        ]
+        terminated_agents = [agent_id for agent_id, status, _ in snapshot if status is _TERMINATED]
+        
+        # 清理已终止的智能体（仅移除仍是同一实例的注册项），锁内不做日志输出
+        removed_agents = []
+        if terminated_agents:
+            with self._agent_lock:
+                remaining = dict(self._agents)
+                for agent_id in terminated_agents:
+                    if remaining.get(agent_id) is agents[agent_id]:
+                        del remaining[agent_id]
+                        removed_agents.append(agent_id)
+                self._publish_agents(remaining)
+        
+        for agent_id in removed_agents:
+            self.logger.info(f"Removed terminated agent: {agent_id}")
+        
+        # 检查心跳
+        now = time.time()
+        for agent_id, _, last_heartbeat in snapshot:
+            if now - last_heartbeat > 30:  # 15秒无心跳
+                self.logger.warning(f"Agent {agent_id} has no heartbeat for 15 seconds")
+    
+    def _publish_agents(self, agents: Dict[str, BasicAgent]) -> None:
+        """替换智能体注册表（调用方需持有 _agent_lock）"""
+        self._agents = agents
+        self.agents = MappingProxyType(agents)
     
     def register_agent(self, agent: BasicAgent) -> None:
         """
@@ -116,12 +109,13 @@ class RuntimeManager(RuntimeManagerInterface):
             if agent.agent_id in self.agents:
                 raise ValueError(f"Agent with ID {agent.agent_id} already registered")
             
-            self.agents[agent.agent_id] = agent
+            agents = dict(self._agents)
+            agents[agent.agent_id] = agent
+            self._publish_agents(agents)
             self.logger.info(f"Registered agent: {agent.agent_id} ({agent.name})")
         
-        print("打印所有已经注册置的智能体ID")
-        for item in self.agents:
-            print(item)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Registered agent ids: %s", list(self.agents))
     
     def unregister_agent(self, agent_id: str) -> None:
         """
@@ -131,10 +125,12 @@ class RuntimeManager(RuntimeManagerInterface):
             agent_id: 要注销的智能体ID
         """
         with self._agent_lock:
-            if agent_id in self.agents:
+            if agent_id in self._agents:
                 # 优雅停止智能体
-                self.agents[agent_id].stop()
-                del self.agents[agent_id]
+                self._agents[agent_id].stop()
+                agents = dict(self._agents)
+                del agents[agent_id]
+                self._publish_agents(agents)
                 self.logger.info(f"Unregistered agent: {agent_id}")
     
     def get_agent(self, agent_id: str) -> Optional[BasicAgent]:
@@ -147,13 +143,11 @@ class RuntimeManager(RuntimeManagerInterface):
         Returns:
             智能体实例或None
         """
-        with self._agent_lock:
-            return self.agents.get(agent_id)
+        return self.agents.get(agent_id)
     
-    def get_all_agents(self) -> Dict[str, BasicAgent]:
-        """获取所有注册的智能体"""
-        with self._agent_lock:
-            return self.agents.copy()
+    def get_all_agents(self) -> Mapping[str, BasicAgent]:
+        """获取所有注册的智能体（只读快照，注册表变更时不会被修改）"""
+        return self.agents
     
     def shutdown(self) -> None:
         """关闭运行时"""
@@ -162,34 +156,35 @@ class RuntimeManager(RuntimeManagerInterface):
         # 停止执行监控
         self.execution_monitor.stop_monitoring()
 
-        # 设置停止标志
-        self._stop_event.set()
-        
         # 停止所有智能体
         with self._agent_lock:
-            for agent in self.agents.values():
+            for agent in self._agents.values():
                 agent.stop()
-            self.agents.clear()
-        
-        # 停止监控线程
-        if self._monitor_thread and self._monitor_thread.is_alive():
-            self._monitor_thread.join(timeout=3.0)
+            self._publish_agents({})
         
         # 停止消息总线
         self.message_bus.stop()
         
         self._running = False
+        self._status_cache = (0.0, None)
         self.logger.info("Runtime manager shutdown complete")
     
     def get_system_status(self) -> Dict[str, Any]:
-        """获取系统状态"""
-        return {
+        """获取系统状态（结果缓存250ms）"""
+        cached_at, status = self._status_cache
+        now = time.monotonic()
+        if status is not None and now - cached_at < self._status_cache_ttl:
+            return status.copy()
+        
+        status = {
             "running": self._running,
             "agent_count": len(self.agents),
-            "message_queue_size": self.message_bus._message_queue.qsize(),
+            "message_queue_size": self.message_bus.approximate_size,
             "active_subscribers": sum(
                 self.message_bus.get_subscriber_count(topic) 
                 for topic in ["broadcast"]
             ) + self.message_bus.get_broadcast_subscriber_count(),
             "timestamp": time.time()
-        }
\ No newline at end of file
+        }
+        self._status_cache = (now, status)
+        return status.copy()
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Profiler Statistics Kernels
+"""
+from typing import Tuple
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _column_stats_py(values, start: int, stop: int) -> Tuple[float, float, float]:
+    """计算列 [start, stop) 区间元素的 (总和, 最小值, 最大值)"""
+    view = memoryview(values)[start:stop]
+    return sum(view), min(view), max(view)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _column_stats_jit(values, start, stop):
+        # 单次遍历同时完成求和与极值归约
+        total = values[start]
+        low = values[start]
+        high = values[start]
+        for i in range(start + 1, stop):
+            value = values[i]
+            total += value
+            if value < low:
+                low = value
+            elif value > high:
+                high = value
+        return total, low, high
+
+    column_stats = _column_stats_jit
+else:
+    column_stats = _column_stats_py
@@ -1,43 +1,191 @@
 """
 Visualization Debugging Interface for Multi-Agent System
 """
-from typing import Dict, List, Any, Optional
+from typing import IO, Any, Dict, List, Mapping, Optional
+from collections import Counter, OrderedDict, deque
 import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
 import time
+import uuid
+import weakref
 from datetime import datetime
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from agents.base_agent import AgentStatus
 from agents.task import TaskStatus
+from messaging.message import Message
 from runtime.types import RuntimeManagerInterface
 
+# 内存中保留的调试会话数量，更早的会话转存到磁盘
+MAX_LIVE_SESSIONS = 16
+
+
+def _json_default(obj: Any) -> Any:
+    """JSON序列化回退：只读映射（如消息的 content/metadata）按字典输出，其余转为字符串"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return str(obj)
+
+
+class _SessionPickler(pickle.Pickler):
+    """转存会话用的 Pickler：只读映射（如记录在事件中的消息内容）按字典保存"""
+    
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, MappingProxyType):
+            return dict, (dict(obj),)
+        return NotImplemented
+
 class VisualDebugger:
     """可视化调试器"""
     
-    def __init__(self, runtime_manager: RuntimeManagerInterface):
+    def __init__(
+        self,
+        runtime_manager: RuntimeManagerInterface,
+        max_events: int = 10000,
+        max_snapshots: int = 100,
+        max_live_sessions: int = MAX_LIVE_SESSIONS,
+        spill_dir: Optional[str] = None
+    ):
         self.runtime_manager = runtime_manager
+        self.logger = logging.getLogger("visual_debugger")
+        # 每个会话的事件与快照使用有界环形缓冲区，超出容量时丢弃最旧的记录
+        self.max_events = max_events
+        self.max_snapshots = max_snapshots
+        # 会话按ID保存，超过 max_live_sessions 时最早的会话被转存到 spill_dir；
+        # 未指定时首次转存才创建本实例专用的临时目录，close() 或实例回收时删除
+        self.max_live_sessions = max_live_sessions
+        self.spill_dir = spill_dir
+        self._spill_cleanup: Optional[weakref.finalize] = None
+        # 本实例转存过的会话：会话ID -> 转存文件名，仅加载其中的会话
+        self._spilled_sessions: Dict[str, str] = {}
         self.debug_session_active = False
         self.debug_data = {
-            "sessions": [],
+            "sessions": OrderedDict(),
             "current_session": None
         }
+        
+        # 调试会话期间通过路由观察者记录真实发生的交互 (发送者, 接收者) -> 消息数
+        self._interactions: Counter = Counter()
+        self._interaction_lock = threading.Lock()
+        self._observing = False
+    
+    def _record_interaction(self, message: Message) -> None:
+        """记录一次智能体间的消息交互"""
+        if not self.debug_session_active:
+            return
+        with self._interaction_lock:
+            self._interactions[(message.sender_id, message.receiver_id)] += 1
     
     def start_debug_session(self, session_name: str = None) -> str:
         """开始调试会话"""
         if not session_name:
-            session_name = f"session_{int(time.time())}"
+            # 附加随机后缀，同一秒内开始的会话也不会相互覆盖
+            session_name = f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
             
         session = {
             "id": session_name,
             "start_time": time.time(),
-            "events": [],
-            "snapshots": []
+            "events": deque(maxlen=self.max_events),
+            "snapshots": deque(maxlen=self.max_snapshots)
         }
         
+        sessions = self.debug_data["sessions"]
         self.debug_data["current_session"] = session
-        self.debug_data["sessions"].append(session)
+        sessions[session_name] = session
+        sessions.move_to_end(session_name)
         self.debug_session_active = True
+        self._set_observing(True)
+        
+        # 转存成功后才从内存移除；转存失败的会话保留在内存中，不会丢失
+        while len(sessions) > self.max_live_sessions:
+            oldest_id = next(iter(sessions))
+            if oldest_id == session_name or not self._spill_session(sessions[oldest_id]):
+                break
+            del sessions[oldest_id]
         
         return session_name
     
+    def stop_debug_session(self) -> None:
+        """停止调试会话，不再记录交互（已记录的数据保留）"""
+        self.debug_session_active = False
+        self._set_observing(False)
+    
+    def _set_observing(self, enabled: bool) -> None:
+        """在路由器上注册或移除交互观察者"""
+        router = getattr(self.runtime_manager, "router", None)
+        if router is None or enabled == self._observing:
+            return
+        if enabled:
+            router.add_route_observer(self._record_interaction)
+        else:
+            router.remove_route_observer(self._record_interaction)
+        self._observing = enabled
+    
+    def close(self) -> None:
+        """停止调试会话并删除本实例创建的转存目录"""
+        self.stop_debug_session()
+        if self._spill_cleanup is not None:
+            self._spill_cleanup()
+            self._spill_cleanup = None
+            self.spill_dir = None
+        self._spilled_sessions.clear()
+    
+    def _session_path(self, session_id: str) -> str:
+        """转存会话的文件路径（文件名为生成的ID，与调用方提供的会话名无关）"""
+        file_name = self._spilled_sessions.get(session_id)
+        if file_name is None:
+            file_name = f"{uuid.uuid4().hex}.pkl"
+        return os.path.join(self.spill_dir, file_name)
+    
+    def _spill_session(self, session: Dict[str, Any]) -> bool:
+        """将会话转存到磁盘，返回是否成功"""
+        try:
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix="debug_sessions_")
+                self._spill_cleanup = weakref.finalize(
+                    self, shutil.rmtree, self.spill_dir, ignore_errors=True
+                )
+            else:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            path = self._session_path(session["id"])
+            with open(path, 'wb') as f:
+                _SessionPickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(session)
+            self._spilled_sessions[session["id"]] = os.path.basename(path)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Failed to spill debug session {session['id']}, keeping it in memory: {e}")
+            return False
+    
+    def _load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """查找会话：先查内存，再从磁盘加载已转存的会话"""
+        session = self.debug_data["sessions"].get(session_id)
+        if session is not None:
+            return session
+        
+        if session_id not in self._spilled_sessions:
+            return None
+        
+        path = self._session_path(session_id)
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Failed to load debug session {session_id}: {e}")
+            return None
+    
     def capture_system_snapshot(self, snapshot_name: str = None) -> Dict[str, Any]:
         """捕获系统快照"""
         if not snapshot_name:
@@ -86,21 +234,51 @@ class VisualDebugger:
         if self.debug_data["current_session"]:
             self.debug_data["current_session"]["events"].append(event)
     
+    @staticmethod
+    def _session_view(session: Dict[str, Any]) -> Dict[str, Any]:
+        """会话的可序列化副本（事件与快照缓冲区转换为列表）"""
+        return dict(session, events=list(session["events"]), snapshots=list(session["snapshots"]))
+    
     def get_debug_data(self) -> Dict[str, Any]:
-        """获取调试数据"""
-        return self.debug_data
+        """获取调试数据（内存中的会话，事件与快照以列表形式返回）"""
+        current = self.debug_data["current_session"]
+        return {
+            "sessions": [self._session_view(session) for session in self.debug_data["sessions"].values()],
+            "current_session": self._session_view(current) if current else None
+        }
     
-    def export_debug_session(self, session_id: str = None) -> str:
-        """导出调试会话数据为JSON"""
+    def export_debug_session(self, session_id: str = None, fp: Optional[IO[str]] = None) -> Optional[str]:
+        """
+        导出调试会话数据为JSON
+        
+        Args:
+            session_id: 会话ID，为空时导出当前会话
+            fp: 可选的文本文件对象；提供时直接流式写入，不在内存中构造完整字符串
+            
+        Returns:
+            JSON字符串；提供fp时返回None
+        """
         if not session_id and self.debug_data["current_session"]:
             session = self.debug_data["current_session"]
         else:
-            session = next((s for s in self.debug_data["sessions"] if s["id"] == session_id), None)
+            session = self._load_session(session_id) if session_id else None
             
         if not session:
-            return "{}"
-            
-        return json.dumps(session, indent=2, default=str)
+            session = {}
+        else:
+            session = self._session_view(session)
+        
+        if fp is not None:
+            json.dump(session, fp, default=_json_default)
+            return None
+        
+        if orjson is not None:
+            return orjson.dumps(
+                session,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode()
+        return json.dumps(session, indent=2, default=_json_default)
     
     def get_agent_interaction_graph(self) -> Dict[str, Any]:
         """生成智能体交互图数据"""
@@ -117,17 +295,17 @@ class VisualDebugger:
                 "status": agent.status.value
             })
         
-        # 创建边（基于消息传递，这里简化处理）
-        # 在实际实现中，可以通过拦截消息路由器来跟踪真实的交互
-        agent_ids = list(agents.keys())
-        for i in range(len(agent_ids)):
-            for j in range(i+1, len(agent_ids)):
-                # 添加示例边
-                edges.append({
-                    "from": agent_ids[i],
-                    "to": agent_ids[j],
-                    "label": "interaction"
-                })
+        # 创建边（基于路由器上实际发生的消息传递）
+        with self._interaction_lock:
+            interactions = list(self._interactions.items())
+        
+        for (sender_id, receiver_id), count in interactions:
+            edges.append({
+                "from": sender_id,
+                "to": receiver_id,
+                "label": "interaction",
+                "weight": count
+            })
         
         return {
             "nodes": nodes,
@@ -2,9 +2,19 @@
 Ecosystem Integration Tools
 """
 from typing import Dict, List, Any, Optional, Callable
-import json
+from http import HTTPStatus
+import logging
+import os
+import pickle
 from abc import ABC, abstractmethod
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+_HTTP_OK = HTTPStatus.OK
+
 class LLMAdapter(ABC):
     """LLM适配器基类"""
     
@@ -22,6 +32,15 @@ class LLMAdapter(ABC):
         """文本嵌入"""
         pass
     
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量文本嵌入
+        
+        默认逐条调用embed_text；对接支持批量输入的嵌入接口时应重写此方法，
+        以一次请求完成整批嵌入。
+        """
+        return [self.embed_text(text) for text in texts]
+    
     def get_model_info(self) -> Dict[str, Any]:
         """获取模型信息"""
         return {
@@ -54,28 +73,29 @@ class Qwen3MaxAdapter(LLMAdapter):
     
     def __init__(self, model_name: str = "qwen3-max", api_key: str = None):
         super().__init__(model_name)
-        self.api_key = api_key
         self.capabilities = ["text_generation", "chat_completion", "reasoning"]
-        # 在实际实现中，这里会初始化DashScope客户端或其他Qwen API客户端
+        
+        # 初始化时一次性导入DashScope SDK并解析API密钥，调用时不再重复查找
+        try:
+            import dashscope
+        except ImportError:
+            import warnings
+            warnings.warn("未安装dashscope库，使用模拟实现。请通过 'pip install dashscope' 安装。")
+            dashscope = None
+        
+        self._dashscope = dashscope
+        self.api_key = api_key
+        if dashscope is not None:
+            self.api_key = api_key or dashscope.api_key or os.getenv('DASHSCOPE_API_KEY')
+            if not self.api_key:
+                raise ValueError("未找到API密钥，请设置DASHSCOPE_API_KEY环境变量或在创建适配器时传入api_key")
     
     def generate_text(self, prompt: str, **kwargs) -> str:
         """生成文本（实际实现）"""
+        if self._dashscope is None:
+            return self._simulated_response(prompt, **kwargs)
+        
         try:
-            # 导入DashScope SDK
-            import dashscope
-            from http import HTTPStatus
-            
-            # 设置API密钥
-            if self.api_key:
-                dashscope.api_key = self.api_key
-            elif not dashscope.api_key:
-                # 尝试从环境变量获取
-                import os
-                dashscope.api_key = os.getenv('DASHSCOPE_API_KEY')
-                
-            if not dashscope.api_key:
-                raise ValueError("未找到API密钥，请设置DASHSCOPE_API_KEY环境变量或在创建适配器时传入api_key")
-            
             # 准备消息列表
             messages = []
             
@@ -89,48 +109,42 @@ class Qwen3MaxAdapter(LLMAdapter):
             messages.append({'role': 'user', 'content': prompt})
             
             # 调用Qwen模型
-            response = dashscope.Generation.call(
+            response = self._dashscope.Generation.call(
                 model='qwen3-max',
                 messages=messages,
-                result_format='message'
+                result_format='message',
+                api_key=self.api_key
             )
             
             # 检查响应状态
-            if response.status_code == HTTPStatus.OK:
+            if response.status_code == _HTTP_OK:
                 return response.output.choices[0].message.content
             else:
                 raise Exception(f"调用Qwen API失败: {response.code} - {response.message}")
                 
-        except ImportError:
-            # 如果没有安装dashscope库，则回退到模拟实现
-            import warnings
-            warnings.warn("未安装dashscope库，使用模拟实现。请通过 'pip install dashscope' 安装。")
-            # 回退到模拟实现
-            if "chat_history" in kwargs:
-                history = kwargs["chat_history"]
-                context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
-                return f"Qwen3-Max回复: 基于我们的对话历史:\n{context}\n\n我对'{prompt}'的理解是..."
-            else:
-                return f"Qwen3-Max回复: 针对'{prompt}'，我认为这是一个很有趣的问题。"
         except Exception as e:
-            # 出现异常时也回退到模拟实现，但记录错误
-            import logging
+            # 出现异常时回退到模拟实现，但记录错误
             logging.error(f"调用Qwen API时出现错误: {e}")
-            # 回退到模拟实现
-            if "chat_history" in kwargs:
-                history = kwargs["chat_history"]
-                context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
-                return f"Qwen3-Max回复: 基于我们的对话历史:\n{context}\n\n我对'{prompt}'的理解是..."
-            else:
-                return f"Qwen3-Max回复: 针对'{prompt}'，我认为这是一个很有趣的问题。"
+            return self._simulated_response(prompt, **kwargs)
+    
+    def _simulated_response(self, prompt: str, **kwargs) -> str:
+        """模拟实现，在无法调用Qwen API时使用"""
+        if "chat_history" in kwargs:
+            history = kwargs["chat_history"]
+            context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
+            return f"Qwen3-Max回复: 基于我们的对话历史:\n{context}\n\n我对'{prompt}'的理解是..."
+        else:
+            return f"Qwen3-Max回复: 针对'{prompt}'，我认为这是一个很有趣的问题。"
             
     def embed_text(self, text: str) -> List[float]:
         """文本嵌入（模拟实现）"""
         # 在实际实现中，这里会调用Qwen的嵌入API
-        # 返回模拟的嵌入向量
-        import hashlib
-        # 简单模拟嵌入向量生成
-        hash_val = int(hashlib.md5(text.encode()).hexdigest(), 16)
+        # 返回模拟的嵌入向量，只需非加密哈希做分桶
+        if xxhash is not None:
+            hash_val = xxhash.xxh64_intdigest(text)
+        else:
+            # 未安装xxhash时使用内置hash（仅在同一进程内稳定）
+            hash_val = hash(text) & 0xFFFFFFFFFFFFFFFF
         return [(hash_val % 1000) / 1000.0, (hash_val % 2000) / 2000.0, (hash_val % 3000) / 3000.0]
     
 class HuggingFaceAdapter(LLMAdapter):
@@ -157,6 +171,8 @@ class ThirdPartyConnector:
     def __init__(self):
         self.services: Dict[str, Any] = {}
         self.templates: Dict[str, Dict[str, Any]] = {}
+        # 模板在注册时序列化一次，实例化时只需反序列化即可得到深拷贝
+        self._template_bytes: Dict[str, bytes] = {}
     
     def register_service(self, service_name: str, connector: Any) -> None:
         """注册服务"""
@@ -169,6 +185,7 @@ class ThirdPartyConnector:
     def register_template(self, template_name: str, template: Dict[str, Any]) -> None:
         """注册应用场景模板"""
         self.templates[template_name] = template
+        self._template_bytes[template_name] = pickle.dumps(template, protocol=5)
     
     def get_template(self, template_name: str) -> Optional[Dict[str, Any]]:
         """获取应用场景模板"""
@@ -180,12 +197,12 @@ class ThirdPartyConnector:
     
     def instantiate_template(self, template_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """实例化模板"""
-        template = self.get_template(template_name)
-        if not template:
+        template_bytes = self._template_bytes.get(template_name)
+        if not template_bytes:
             raise ValueError(f"Template '{template_name}' not found")
         
         # 简单的参数替换实现
-        instantiated = json.loads(json.dumps(template))
+        instantiated = pickle.loads(template_bytes)
         
         # 在实际实现中，这里会有更复杂的模板渲染逻辑
         return instantiated
@@ -2,23 +2,116 @@
 Performance Profiling Tools
 """
 from typing import Dict, List, Any, Optional
+from array import array
+import asyncio
+import logging
 import time
 import psutil
 import threading
-from collections import defaultdict
 from agents.base_agent import AgentStatus
-from agents.task import TaskStatus
 from runtime.types import RuntimeManagerInterface
+from tools._profiler_kernels import column_stats
+
+# 采样的固定字段结构：(字段名, array 类型码)，每个字段对应一列环形缓冲区
+_SYSTEM_FIELDS = (
+    # 单调时钟纳秒数，不受系统时间调整影响；输出时换算为墙上时间
+    ("timestamp", 'Q'),
+    ("cpu_percent", 'd'),
+    ("memory_percent", 'd'),
+    ("memory_used", 'Q'),
+    ("memory_total", 'Q'),
+    # 磁盘读写字节数为相对上一次采样的增量
+    ("disk_read_bytes", 'Q'),
+    ("disk_write_bytes", 'Q'),
+)
+_APP_FIELDS = (
+    ("agent_count", 'I'),
+    ("total_tasks", 'I'),
+    ("completed_tasks", 'I'),
+    ("failed_tasks", 'I'),
+    ("message_queue_size", 'I'),
+)
+# 智能体状态分布按状态各占一列
+_AGENT_STATUSES = tuple(status.value for status in AgentStatus)
+_STATUS_INDEX = {status: index for index, status in enumerate(_AGENT_STATUSES)}
+# 连续失败超过该次数后才开始指数退避，最长退避时间（秒）
+_BACKOFF_AFTER_FAILURES = 3
+_MAX_BACKOFF = 60.0
+
+
+class _RateLimitFilter(logging.Filter):
+    """限流过滤器：同一位置、同类异常的相同日志在 period 秒内只输出一次"""
+    
+    def __init__(self, period: float = 30.0):
+        super().__init__()
+        self.period = period
+        self._last_emitted: Dict[tuple, float] = {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        # 异常类型也作为键的一部分，不同类型的异常各自限流
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.pathname, record.lineno, record.msg, exc_type)
+        now = time.monotonic()
+        last = self._last_emitted.get(key)
+        if last is not None and now - last < self.period:
+            return False
+        self._last_emitted[key] = now
+        return True
+
+
+def _column(typecode: str, capacity: int) -> array:
+    """预分配一列定长缓冲区"""
+    return array(typecode, bytes(array(typecode).itemsize * capacity))
+
+
+class _ProfileStore:
+    """采样列存储：每个字段对应一个固定属性，写入时为属性访问而非字典查找"""
+    
+    __slots__ = tuple(name for name, _ in _SYSTEM_FIELDS + _APP_FIELDS) + ("agent_statuses",)
+    
+    def __init__(self, capacity: int):
+        for name, typecode in _SYSTEM_FIELDS + _APP_FIELDS:
+            setattr(self, name, _column(typecode, capacity))
+        # 与 _AGENT_STATUSES 顺序一致的各状态计数列
+        self.agent_statuses = tuple(_column('I', capacity) for _ in _AGENT_STATUSES)
+
 
 class PerformanceProfiler:
     """性能分析器"""
     
-    def __init__(self, runtime_manager: RuntimeManagerInterface):
+    def __init__(self, runtime_manager: RuntimeManagerInterface, max_samples: int = 3600):
         self.runtime_manager = runtime_manager
         self.profiling_active = False
-        self.profiles: Dict[str, List] = defaultdict(list)
+        # 采样按固定结构存放在预分配的列式环形缓冲区中（未装箱的机器类型），
+        # 超出容量时覆盖最旧的采样；字典形式的数据仅在读取时构建。
+        # 缓冲区容量为不小于 max_samples + 1 的2的幂，槽位由单调递增的位置与掩码
+        # 按位与得到；采样方正在写入的槽位不可读，因此可读采样数为容量减一
+        capacity = 1 << max(max_samples, 1).bit_length()
+        self.max_samples = capacity - 1
+        self._capacity = capacity
+        self._mask = capacity - 1
+        self.profiles = _ProfileStore(capacity)
+        # 写指针只由采样方推进，读指针只由读取方推进（清空数据时）；
+        # 读取方先快照指针再读取槽位，读完后再次检查写指针
+        self._head = 0
+        self._tail = 0
+        # 预热 CPU 采样基线，之后的非阻塞调用返回两次调用之间的占用率
+        psutil.cpu_percent(interval=None)
+        # 磁盘计数器基线，采样时记录增量
+        self._last_disk = psutil.disk_io_counters()
+        # 单调时钟与墙上时间的对应基准
+        self._wall_anchor = time.time()
+        self._monotonic_anchor = time.monotonic_ns()
         self.profile_thread: Optional[threading.Thread] = None
+        self.profile_task: Optional[asyncio.Task] = None
+        self._profile_loop_owner: Optional[asyncio.AbstractEventLoop] = None
         self.stop_event = threading.Event()
+        self._consecutive_failures = 0
+        self.logger = logging.getLogger("profiler")
+        # 采样循环的错误使用专用子记录器限流，不影响 "profiler" 上的其他日志
+        self._loop_logger = logging.getLogger("profiler.loop")
+        if not any(isinstance(f, _RateLimitFilter) for f in self._loop_logger.filters):
+            self._loop_logger.addFilter(_RateLimitFilter())
         
     def start_profiling(self, interval: float = 1.0) -> None:
         """开始性能分析"""
@@ -27,6 +120,17 @@ class PerformanceProfiler:
             
         self.profiling_active = True
         self.stop_event.clear()
+        
+        # 在事件循环中调用时复用该循环调度采样，不再额外占用线程
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._profile_loop_owner = loop
+            self.profile_task = loop.create_task(self._profile_loop_async(interval))
+            return
+        
         self.profile_thread = threading.Thread(
             target=self._profile_loop,
             args=(interval,),
@@ -41,6 +145,16 @@ class PerformanceProfiler:
             
         self.profiling_active = False
         self.stop_event.set()
+        task, loop = self.profile_task, self._profile_loop_owner
+        self.profile_task = None
+        self._profile_loop_owner = None
+        if task is not None and not loop.is_closed():
+            # 协程可能运行在其他线程的事件循环中，需线程安全地取消
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # 事件循环已在检查后关闭，任务随之结束
+                pass
         if self.profile_thread and self.profile_thread.is_alive():
             self.profile_thread.join(timeout=2.0)
     
@@ -49,113 +163,206 @@ class PerformanceProfiler:
         while not self.stop_event.is_set():
             try:
                 self._collect_profile_data()
-                time.sleep(interval)
-            except Exception as e:
-                print(f"Error in profile loop: {e}")
-                time.sleep(1.0)
+                self._consecutive_failures = 0
+                delay = interval
+            except Exception:
+                delay = self._on_profile_error(interval)
+            # 采样不再阻塞，按完整间隔等待；停止时可立即唤醒
+            self.stop_event.wait(delay)
+    
+    async def _profile_loop_async(self, interval: float) -> None:
+        """基于事件循环的性能分析循环"""
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    # 采样不阻塞（CPU 占用率为非阻塞读取），可直接在事件循环中执行
+                    self._collect_profile_data()
+                    self._consecutive_failures = 0
+                    delay = interval
+                except Exception:
+                    delay = self._on_profile_error(interval)
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    break
+        finally:
+            # 事件循环结束（如 asyncio.run 返回）时任务被取消，同步复位分析状态；
+            # 已被 stop_profiling 或新一轮分析接管时不做处理
+            if self.profile_task is not None and self.profile_task is asyncio.current_task():
+                self.profiling_active = False
+                self.profile_task = None
+                self._profile_loop_owner = None
+    
+    def _on_profile_error(self, interval: float) -> float:
+        """记录采样异常（限流），返回下一次采样前的等待时间"""
+        self._consecutive_failures += 1
+        self._loop_logger.exception("Error in profile loop")
+        # 偶发失败按正常间隔重试，持续失败时指数退避
+        excess = self._consecutive_failures - _BACKOFF_AFTER_FAILURES
+        if excess <= 0:
+            return interval
+        return min(interval * (2 ** excess), _MAX_BACKOFF)
     
     def _collect_profile_data(self) -> None:
         """收集性能数据"""
-        timestamp = time.time()
+        timestamp = time.monotonic_ns()
         
         # 收集系统级指标
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory_info = psutil.virtual_memory()
         disk_io = psutil.disk_io_counters()
         
-        system_profile = {
-            "timestamp": timestamp,
-            "cpu_percent": cpu_percent,
-            "memory_percent": memory_info.percent,
-            "memory_used": memory_info.used,
-            "memory_total": memory_info.total,
-            "disk_read_bytes": disk_io.read_bytes if disk_io else 0,
-            "disk_write_bytes": disk_io.write_bytes if disk_io else 0
-        }
-        
-        self.profiles["system"].append(system_profile)
+        profiles = self.profiles
+        head = self._head
+        slot = head & self._mask
+        profiles.timestamp[slot] = timestamp
+        profiles.cpu_percent[slot] = cpu_percent
+        profiles.memory_percent[slot] = memory_info.percent
+        profiles.memory_used[slot] = memory_info.used
+        profiles.memory_total[slot] = memory_info.total
+        last_disk = self._last_disk
+        if disk_io and last_disk:
+            # 计数器可能因设备变化回绕，此时按0处理
+            profiles.disk_read_bytes[slot] = max(disk_io.read_bytes - last_disk.read_bytes, 0)
+            profiles.disk_write_bytes[slot] = max(disk_io.write_bytes - last_disk.write_bytes, 0)
+        else:
+            profiles.disk_read_bytes[slot] = 0
+            profiles.disk_write_bytes[slot] = 0
+        self._last_disk = disk_io
         
         # 收集应用级指标
-        app_profile = self._collect_app_metrics()
-        app_profile["timestamp"] = timestamp
-        self.profiles["application"].append(app_profile)
+        self._collect_app_metrics(slot)
+        
+        # 整条采样写完后再发布写指针
+        self._head = head + 1
     
-    def _collect_app_metrics(self) -> Dict[str, Any]:
-        """收集应用级指标"""
+    def _collect_app_metrics(self, slot: int) -> None:
+        """收集应用级指标并写入指定槽位"""
         agents = self.runtime_manager.get_all_agents()
         
         # 统计智能体状态
-        status_counts = defaultdict(int)
+        status_tally = [0] * len(_AGENT_STATUSES)
         total_tasks = 0
         completed_tasks = 0
         failed_tasks = 0
         
         for agent in agents.values():
-            status_counts[agent.status.value] += 1
+            status_tally[_STATUS_INDEX[agent.status.value]] += 1
             
-            # 统计任务信息
+            # 统计任务信息（读取任务引擎按状态变更维护的计数，无需遍历任务）
             if hasattr(agent, 'task_engine'):
-                tasks = agent.task_engine.get_all_tasks()
-                total_tasks += len(tasks)
-                completed_tasks += len([t for t in tasks if t["status"] == TaskStatus.COMPLETED.value])
-                failed_tasks += len([t for t in tasks if t["status"] == TaskStatus.FAILED.value])
+                task_counts = agent.task_engine.status_counts()
+                total_tasks += task_counts["total"]
+                completed_tasks += task_counts["completed"]
+                failed_tasks += task_counts["failed"]
         
-        return {
-            "agent_count": len(agents),
-            "agent_status_distribution": dict(status_counts),
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "failed_tasks": failed_tasks,
-            "message_queue_size": self.runtime_manager.get_system_status().get("message_queue_size", 0)
-        }
+        profiles = self.profiles
+        profiles.agent_count[slot] = len(agents)
+        profiles.total_tasks[slot] = total_tasks
+        profiles.completed_tasks[slot] = completed_tasks
+        profiles.failed_tasks[slot] = failed_tasks
+        profiles.message_queue_size[slot] = self.runtime_manager.get_system_status().get("message_queue_size", 0)
+        for column, count in zip(profiles.agent_statuses, status_tally):
+            column[slot] = count
+    
+    def _readable_start(self, head: int) -> int:
+        """写指针为 head 时最旧的可读位置（之前的位置已清空或可能正被采样方覆盖）"""
+        return max(self._tail, head - self.max_samples)
+    
+    def _window_stats(self, column: array, first: int, count: int) -> tuple:
+        """计算从位置 first 起 count 个采样的 (总和, 最小值, 最大值)，回绕时分两段归约"""
+        start = first & self._mask
+        stop = start + count
+        if stop <= self._capacity:
+            return column_stats(column, start, stop)
+        total1, low1, high1 = column_stats(column, start, self._capacity)
+        total2, low2, high2 = column_stats(column, 0, stop - self._capacity)
+        return total1 + total2, min(low1, low2), max(high1, high2)
     
     def get_performance_report(self) -> Dict[str, Any]:
         """获取性能报告"""
-        if not self.profiles:
-            return {"error": "No profiling data available"}
+        profiles = self.profiles
+        timestamps = profiles.timestamp
+        mask = self._mask
         
-        # 计算系统指标统计
-        system_data = self.profiles["system"]
-        app_data = self.profiles["application"]
-        
-        if not system_data or not app_data:
-            return {"error": "Insufficient profiling data"}
-        
-        # 系统指标统计
-        cpu_values = [d["cpu_percent"] for d in system_data]
-        memory_values = [d["memory_percent"] for d in system_data]
+        # 顺序锁方式读取：计算完成后再次检查写指针，若读取期间采样方已覆盖到可读窗口则重算
+        while True:
+            head = self._head
+            first = self._readable_start(head)
+            count = head - first
+            if count <= 0:
+                return {"error": "No profiling data available"}
+            
+            # 安装了 numba 时使用JIT内核归约
+            cpu_sum, cpu_min, cpu_max = self._window_stats(profiles.cpu_percent, first, count)
+            memory_sum, memory_min, memory_max = self._window_stats(profiles.memory_percent, first, count)
+            agents_sum, _, agents_max = self._window_stats(profiles.agent_count, first, count)
+            tasks_sum, _, tasks_max = self._window_stats(profiles.total_tasks, first, count)
+            duration = (timestamps[(head - 1) & mask] - timestamps[first & mask]) / 1e9 if count > 1 else 0
+            
+            if self._head - self.max_samples <= first:
+                break
         
         system_stats = {
-            "cpu_avg": sum(cpu_values) / len(cpu_values) if cpu_values else 0,
-            "cpu_max": max(cpu_values) if cpu_values else 0,
-            "cpu_min": min(cpu_values) if cpu_values else 0,
-            "memory_avg": sum(memory_values) / len(memory_values) if memory_values else 0,
-            "memory_max": max(memory_values) if memory_values else 0,
-            "memory_min": min(memory_values) if memory_values else 0
+            "cpu_avg": cpu_sum / count,
+            "cpu_max": cpu_max,
+            "cpu_min": cpu_min,
+            "memory_avg": memory_sum / count,
+            "memory_max": memory_max,
+            "memory_min": memory_min
         }
         
-        # 应用指标统计
-        agent_counts = [d["agent_count"] for d in app_data]
-        task_counts = [d["total_tasks"] for d in app_data]
-        
         app_stats = {
-            "avg_agents": sum(agent_counts) / len(agent_counts) if agent_counts else 0,
-            "max_agents": max(agent_counts) if agent_counts else 0,
-            "avg_tasks": sum(task_counts) / len(task_counts) if task_counts else 0,
-            "max_tasks": max(task_counts) if task_counts else 0
+            "avg_agents": agents_sum / count,
+            "max_agents": agents_max,
+            "avg_tasks": tasks_sum / count,
+            "max_tasks": tasks_max
         }
         
         return {
             "system_stats": system_stats,
             "app_stats": app_stats,
-            "data_points": len(system_data),
-            "duration_seconds": system_data[-1]["timestamp"] - system_data[0]["timestamp"] if len(system_data) > 1 else 0
+            "data_points": count,
+            "duration_seconds": duration
         }
     
     def get_profile_data(self) -> Dict[str, List]:
         """获取原始性能数据"""
-        return dict(self.profiles)
+        head = self._head
+        first = self._readable_start(head)
+        if head <= first:
+            return {}
+        
+        profiles = self.profiles
+        mask = self._mask
+        timestamps = profiles.timestamp
+        system_columns = [(name, getattr(profiles, name)) for name, _ in _SYSTEM_FIELDS]
+        app_columns = [(name, getattr(profiles, name)) for name, _ in _APP_FIELDS]
+        status_columns = list(zip(_AGENT_STATUSES, profiles.agent_statuses))
+        system_data = []
+        app_data = []
+        # 按时间先后遍历可读位置
+        for position in range(first, head):
+            slot = position & mask
+            timestamp = self._wall_anchor + (timestamps[slot] - self._monotonic_anchor) / 1e9
+            system_profile = {name: column[slot] for name, column in system_columns}
+            system_profile["timestamp"] = timestamp
+            system_data.append(system_profile)
+            app_profile = {name: column[slot] for name, column in app_columns}
+            app_profile["agent_status_distribution"] = {
+                status: column[slot] for status, column in status_columns if column[slot]
+            }
+            app_profile["timestamp"] = timestamp
+            app_data.append(app_profile)
+        
+        # 顺序锁式校验：复制期间采样方可能已覆盖最旧的若干位置，丢弃这些可能被撕裂的记录
+        stale = (self._head - self.max_samples) - first
+        if stale > 0:
+            del system_data[:stale]
+            del app_data[:stale]
+        
+        return {"system": system_data, "application": app_data}
     
     def clear_profiles(self) -> None:
-        """清空性能数据"""
-        self.profiles.clear()
\ No newline at end of file
+        """清空性能数据（只推进读指针，不改动采样方拥有的写指针）"""
+        self._tail = self._head
@@ -4,6 +4,8 @@ Agent Behavior Simulator
 from typing import Dict, List, Any, Optional, Callable
 import time
 import random
+from array import array
+from itertools import count
 from agents.agent_impl import BasicAgent
 from agents.task import Task
 from messaging.router import MessageRouter
@@ -12,6 +14,15 @@ from messaging.pubsub import PubSubBus
 # 删除 RuntimeManager 的导入，改为在需要时局部导入
 # from runtime.runtime_manager import RuntimeManager
 
+# 预生成的延迟表长度（2的幂，按位与取槽位）
+_LATENCY_TABLE_SIZE = 8192
+_LATENCY_MASK = _LATENCY_TABLE_SIZE - 1
+
+
+def _latency_table(low: float, high: float) -> array:
+    """预生成 [low, high] 区间内均匀分布的延迟表"""
+    return array('d', (random.uniform(low, high) for _ in range(_LATENCY_TABLE_SIZE)))
+
 
 class AgentBehaviorSimulator:
     """智能体行为模拟器"""
@@ -23,18 +34,32 @@ class AgentBehaviorSimulator:
         self.simulated_agents: Dict[str, BasicAgent] = {}
         self.behavior_patterns: Dict[str, Callable] = {}
         self.simulation_speed = 1.0  # 1.0表示正常速度，<1.0表示加速，>1.0表示减速
+        # 各行为的延迟表在初始化时一次生成，行为处理时按序循环取用
+        self._latency_chatty = _latency_table(0.1, 0.5)
+        self._latency_lazy_silent = _latency_table(0.5, 2.0)
+        self._latency_lazy_reply = _latency_table(0.2, 1.0)
+        self._latency_workaholic = _latency_table(0.05, 0.2)
+        self._latency_default = _latency_table(0.1, 1.0)
+        self._latency_cursor = count()
+        # 每个模拟周期批量生成并发送的消息数。行为处理器在共享总线的分发线程上
+        # 同步执行（含模拟延迟），批量过大时消息积压速度会超过处理速度
+        self.batch_size = 1
+        # 所有模拟智能体共用一套独立于运行时的消息总线和路由器，彼此之间可以互相投递
+        self._sim_pubsub: Optional[PubSubBus] = None
+        self._sim_router: Optional[MessageRouter] = None
         
     def create_simulated_agent(self, agent_id: str, name: str, behavior_pattern: str = "default") -> BasicAgent:
         """创建模拟智能体"""
-        # 创建独立的消息总线和路由器用于模拟
-        sim_pubsub = PubSubBus()
-        sim_router = MessageRouter(sim_pubsub)
-        sim_pubsub.start()
+        # 首次创建时建立模拟专用的消息总线和路由器
+        if self._sim_router is None:
+            self._sim_pubsub = PubSubBus()
+            self._sim_router = MessageRouter(self._sim_pubsub)
+            self._sim_pubsub.start()
         
         agent = BasicAgent(
             agent_id=agent_id,
             name=name,
-            router=sim_router,
+            router=self._sim_router,
             persistent_state=False
         )
         
@@ -59,43 +84,48 @@ class AgentBehaviorSimulator:
             # 默认行为
             agent.register_handler("simulate_default", self._default_behavior)
     
+    def _simulate_latency(self, table: array) -> None:
+        """从延迟表中取下一个延迟并等待（多个处理线程共享游标，next() 在GIL下是原子的）"""
+        time.sleep(table[next(self._latency_cursor) & _LATENCY_MASK] / self.simulation_speed)
+    
     def _chatty_behavior(self, message) -> Dict[str, Any]:
         """健谈型行为"""
-        time.sleep(random.uniform(0.1, 0.5) / self.simulation_speed)
+        self._simulate_latency(self._latency_chatty)
         return {"status": "chatty_response", "message": "Thanks for your message!"}
     
     def _lazy_behavior(self, message) -> Dict[str, Any]:
         """懒惰型行为"""
         # 70%概率不响应
         if random.random() < 0.7:
-            time.sleep(random.uniform(0.5, 2.0) / self.simulation_speed)
+            self._simulate_latency(self._latency_lazy_silent)
             return {"status": "no_response"}
         else:
-            time.sleep(random.uniform(0.2, 1.0) / self.simulation_speed)
+            self._simulate_latency(self._latency_lazy_reply)
             return {"status": "lazy_response", "message": "Okay, I got it."}
     
     def _workaholic_behavior(self, message) -> Dict[str, Any]:
         """工作狂行为"""
         # 快速处理任务
-        time.sleep(random.uniform(0.05, 0.2) / self.simulation_speed)
+        self._simulate_latency(self._latency_workaholic)
         return {"status": "work_completed", "result": "Task done efficiently"}
     
     def _default_behavior(self, message) -> Dict[str, Any]:
         """默认行为"""
-        time.sleep(random.uniform(0.1, 1.0) / self.simulation_speed)
+        self._simulate_latency(self._latency_default)
         return {"status": "default_response", "message": "Processed"}
     
     def run_simulation(self, duration: float = 60.0) -> None:
         """运行模拟"""
         self.simulation_active = True
-        start_time = time.time()
+        # 使用单调时钟计时，不受系统时间调整影响
+        deadline = time.monotonic_ns() + int(duration * 1e9)
         
         # 启动所有模拟智能体
         for agent in self.simulated_agents.values():
             agent.start()
         
         # 运行模拟
-        while self.simulation_active and (time.time() - start_time) < duration:
+        while self.simulation_active and time.monotonic_ns() < deadline:
             # 模拟智能体间的消息传递
             self._simulate_interactions()
             time.sleep(0.5 / self.simulation_speed)
@@ -110,23 +140,34 @@ class AgentBehaviorSimulator:
         if len(agent_ids) < 2:
             return
             
-        # 随机选择发送者和接收者
-        sender_id = random.choice(agent_ids)
-        receiver_id = random.choice([aid for aid in agent_ids if aid != sender_id])
+        n = len(agent_ids)
+        timestamp_ms = int(time.time() * 1000)
         
-        sender = self.simulated_agents[sender_id]
+        # 先生成整批消息，按发送者分组后批量提交
+        batches: Dict[str, List] = {}
+        for seq in range(self.batch_size):
+            # 随机选择发送者和接收者：接收者在其余 n-1 个位置中均匀选取，跳过发送者，无需构建候选列表
+            sender_index = random.randrange(n)
+            receiver_index = random.randrange(n - 1)
+            if receiver_index >= sender_index:
+                receiver_index += 1
+            sender_id = agent_ids[sender_index]
+            receiver_id = agent_ids[receiver_index]
+            
+            message_type = random.choice(["simulate_chatty", "simulate_default", "task"])
+            batches.setdefault(sender_id, []).append((
+                receiver_id,
+                message_type,
+                {
+                    "simulation_id": f"sim_msg_{timestamp_ms}_{seq}",
+                    "type": message_type,
+                    "data": f"Simulated message from {sender_id} to {receiver_id}"
+                }
+            ))
         
         # 发送模拟消息
-        message_type = random.choice(["simulate_chatty", "simulate_default", "task"])
-        sender.send_message(
-            receiver_id=receiver_id,
-            msg_type=message_type,
-            content={
-                "simulation_id": f"sim_msg_{int(time.time()*1000)}",
-                "type": message_type,
-                "data": f"Simulated message from {sender_id} to {receiver_id}"
-            }
-        )
+        for sender_id, envelopes in batches.items():
+            self.simulated_agents[sender_id].send_messages_batch(envelopes)
     
     def stop_simulation(self) -> None:
         """停止模拟"""
@@ -149,10 +190,19 @@ class AgentBehaviorSimulator:
             # 添加任务统计（如果有任务引擎）
             if hasattr(agent, 'task_engine'):
                 tasks = agent.task_engine.get_all_tasks()
+                # 单次遍历同时统计完成与失败数量
+                completed_tasks = 0
+                failed_tasks = 0
+                for task in tasks:
+                    status = task["status"]
+                    if status == "completed":
+                        completed_tasks += 1
+                    elif status == "failed":
+                        failed_tasks += 1
                 report["agents"][agent_id]["task_stats"] = {
                     "total_tasks": len(tasks),
-                    "completed_tasks": len([t for t in tasks if t["status"] == "completed"]),
-                    "failed_tasks": len([t for t in tasks if t["status"] == "failed"])
+                    "completed_tasks": completed_tasks,
+                    "failed_tasks": failed_tasks
                 }
         
         return report
\ No newline at end of file